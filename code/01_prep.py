@@ -1,9 +1,10 @@
 import os
+import numpy as np
 import pandas as pd
 
 from utils import (
     ROOT, BASE_DIR, OUT_DIR,
-    ensure_dirs, zscore, log1p_safe, write_json, write_md, now_iso
+    ensure_dirs, zscore, log1p_safe, read_frame, write_json, write_md, now_iso
 )
 
 
@@ -12,13 +13,88 @@ DATA_XLSX = os.path.join(
     "MAJOR_T1_NUMERIC_ONLY_SCORES_HADS_FBK_LPFS_ECR_IMPUTED_GENERALKONSENT_J_ONLY.xlsx",
 )
 
+# Derived PCI³ components, used only when the workbook lacks the column.
+# Each input is (raw column, transform); the composite is the row mean of
+# z(transform(raw)) over the inputs that are non-missing for that row.
+COMPOSITE_REGISTRY = {
+    "utilization_shortterm_z": [
+        ("konsultationen_plus7_Anzahl", "log1p"),
+        ("konsultationen_plus14_Anzahl", "log1p"),
+    ],
+    "pharmaburden_z": [
+        ("kisim_medi_distinct_atc", "log1p"),
+        ("kisim_medi_n", "log1p"),
+    ],
+    "pain_burden_z": [
+        ("szerf_postop_Anzahl", "log1p"),
+        ("schmerz_meds_ab_op_plus7_Anzahl", "log1p"),
+        ("meds_plus7_Anzahl_Opiate", "log1p"),
+    ],
+    "sedation_risk_z": [
+        ("meds_plus7_Anzahl_Benzodiazepin_ZDerivat", None),
+        ("meds_plus7_Anzahl_Opiate", None),
+    ],
+}
+
+
+def _composite_formula(inputs) -> str:
+    terms = [f"z(log1p({c}))" if t == "log1p" else f"z({c})" for c, t in inputs]
+    return f"mean({', '.join(terms)})"
+
+
+def _build_composites(df: pd.DataFrame, needed: list[str]) -> tuple[pd.DataFrame, dict]:
+    """
+    Derive the registry composites in `needed` that are absent from df.
+
+    All derivable composites are computed in one matrix pass: log1p on the raw
+    count block, column-wise z, then a masked row mean per composite.
+    Returns (composites, provenance).
+    """
+    provenance = {}
+    todo = []
+    for name in needed:
+        if name not in COMPOSITE_REGISTRY:
+            continue
+        inputs = COMPOSITE_REGISTRY[name]
+        entry = {"formula": _composite_formula(inputs), "inputs": [c for c, _ in inputs]}
+        missing = [c for c, _ in inputs if c not in df.columns]
+        if name in df.columns:
+            entry["source"] = "existing_column"
+        elif missing:
+            entry["source"] = "unavailable"
+            entry["missing_inputs"] = missing
+        else:
+            entry["source"] = "derived"
+            todo.append(name)
+        provenance[name] = entry
+    if not todo:
+        return pd.DataFrame(index=df.index), provenance
+
+    # unique (column, transform) pairs across all composites -> one raw block
+    block = list(dict.fromkeys(inp for name in todo for inp in COMPOSITE_REGISTRY[name]))
+    raw = df[[c for c, _ in block]].apply(pd.to_numeric, errors="coerce")
+    raw.columns = range(len(block))
+    logged = [j for j, (_, t) in enumerate(block) if t == "log1p"]
+    raw[logged] = log1p_safe(raw[logged])
+    z = zscore(raw).to_numpy()
+
+    # membership (block inputs × composites); masked mean = sum(z) / count over non-missing
+    W = np.array([[inp in COMPOSITE_REGISTRY[name] for name in todo] for inp in block], dtype=float)
+    mask = ~np.isnan(z)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        comp = (np.where(mask, z, 0.0) @ W) / (mask @ W)
+
+    composites = pd.DataFrame(comp, index=df.index, columns=todo)
+    for name in todo:
+        provenance[name]["n_nonmissing"] = int(composites[name].notna().sum())
+    return composites, provenance
+
+
 def _cronbach_alpha_listwise(df: pd.DataFrame, cols: list[str]) -> tuple[float, int, int]:
     """
     Cronbach's alpha with listwise complete cases.
     Returns (alpha, n_complete, k_items).
     """
-    import numpy as np
-
     if not cols:
         return float("nan"), 0, 0
     x = df[cols].apply(pd.to_numeric, errors="coerce")
@@ -97,7 +173,7 @@ def _compute_ecr_rescored_0_4(df: pd.DataFrame) -> tuple[pd.Series | None, pd.Se
 def main():
     ensure_dirs()
 
-    df = pd.read_excel(DATA_XLSX)
+    df = read_frame(DATA_XLSX, pd.read_excel)
     audit = {
         "timestamp": now_iso(),
         "input_file": DATA_XLSX,
@@ -106,6 +182,18 @@ def main():
         "columns": list(df.columns),
     }
 
+    # Primary index PCI³ components; derive any that the workbook lacks from raw counts
+    components = [
+        "utilization_shortterm_z",
+        "pharmaburden_z",
+        "pain_burden_z",
+        "sedation_risk_z",
+    ]
+    derived, composite_prov = _build_composites(df, components)
+    for c in derived.columns:
+        df[c] = derived[c]
+    audit["composites"] = composite_prov
+
     # Required columns (minimum)
     required = [
         "PID",
@@ -155,13 +243,6 @@ def main():
         df["age_z"] = zscore(df["age"])
 
     # Primary index PCI³
-    components = [
-        "utilization_shortterm_z",
-        "pharmaburden_z",
-        "pain_burden_z",
-        "sedation_risk_z",
-    ]
-
     if "lab_postop_Anzahl" in df.columns:
         df["lab_postop_z"] = zscore(log1p_safe(df["lab_postop_Anzahl"]))
         components.append("lab_postop_z")
@@ -191,6 +272,7 @@ def main():
 - **rows/cols**: {audit['n_rows']} / {audit['n_cols']}
 - **missing required columns**: {missing_req if missing_req else "none"}
 - **PCI³ components**: {", ".join(components)}
+- **derived composites**: {", ".join(derived.columns) if len(derived.columns) else "none"}
 - **prepared dataset**: `{out_csv}`
 """,
     )
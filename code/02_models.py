@@ -3,11 +3,23 @@ import json
 import numpy as np
 import pandas as pd
 
-from utils import OUT_DIR, ensure_dirs, write_json, write_md, now_iso
+from utils import (
+    OUT_DIR, SEED, RNG_BLOCK_SIZE,
+    ensure_dirs, read_frame, run_replicates, write_json, write_md, now_iso
+)
 
 
-SEED = 1337
-np.random.seed(SEED)
+# Case bootstrap of a1–a4 is opt-in (e.g. N_BOOT = 2000); CIs go to model_results.json only.
+# Bootstrap output does not depend on the worker count (see utils.run_replicates).
+N_BOOT = 0
+N_WORKERS = min(8, os.cpu_count() or 1)
+
+# Prepared CSVs at or above this size are fitted out-of-core (two streamed passes).
+STREAM_MIN_BYTES = 2 * 1024 ** 3
+STREAM_CHUNK_ROWS = 500_000
+
+SURFACE_TERMS = ["anx_z", "avoid_z", "anx2", "anx_x_avoid", "avoid2"]
+SECONDARY_OUTCOMES = ["utilization_shortterm_z", "pharmaburden_z", "pain_burden_z", "sedation_risk_z"]
 
 
 def _ols_fit(X: np.ndarray, y: np.ndarray):
@@ -29,103 +41,279 @@ def _ols_fit(X: np.ndarray, y: np.ndarray):
     return beta, se, yhat, resid
 
 
+def _ols_suffstats(X: np.ndarray, y: np.ndarray) -> dict:
+    """Pass 1 statistics of one chunk (X'X, X'y); chunks/workers merge by summing."""
+    X_ = np.column_stack([np.ones(X.shape[0]), X])
+    return {"n": X_.shape[0], "xtx": X_.T @ X_, "xty": X_.T @ y, "sum_y": y.sum()}
+
+
+def _hc3_suffstats(X: np.ndarray, y: np.ndarray, beta: np.ndarray, XtX_inv: np.ndarray, y_mean: float) -> dict:
+    """Pass 2 statistics of one chunk (HC3 meat, SSR, SST); chunks/workers merge by summing."""
+    X_ = np.column_stack([np.ones(X.shape[0]), X])
+    resid = y - X_ @ beta
+    h = np.sum(X_ * (X_ @ XtX_inv), axis=1)
+    denom = (1 - h) ** 2
+    denom[denom == 0] = np.nan
+    omega = (resid ** 2) / denom
+    return {"meat": (X_.T * omega) @ X_, "ssr": np.sum(resid ** 2), "sst": np.sum((y - y_mean) ** 2)}
+
+
+def _merge_stats(a: dict, b: dict) -> dict:
+    return {k: a[k] + b[k] for k in a}
+
+
+def _ols_fit_streamed(chunks) -> dict:
+    """
+    Out-of-core OLS with HC3 SE for several models sharing one chunked data source.
+
+    `chunks()` must return a fresh iterator of {model: (X, y)} blocks on every call
+    (two passes are made). Memory is bounded by the chunk size; estimates match
+    _ols_fit up to floating-point rounding. Models with n <= k are returned as
+    {"n": n} only (not fitted).
+    """
+    pass1 = {}
+    for block in chunks():
+        for name, (X, y) in block.items():
+            st = _ols_suffstats(X, y)
+            pass1[name] = _merge_stats(pass1[name], st) if name in pass1 else st
+
+    solved = {}
+    for name, st in pass1.items():
+        if st["n"] <= st["xtx"].shape[0]:
+            continue
+        XtX_inv = np.linalg.inv(st["xtx"])
+        solved[name] = (np.linalg.solve(st["xtx"], st["xty"]), XtX_inv, st["sum_y"] / st["n"])
+
+    pass2 = {}
+    for block in chunks():
+        for name, (X, y) in block.items():
+            if name not in solved:
+                continue
+            st = _hc3_suffstats(X, y, *solved[name])
+            pass2[name] = _merge_stats(pass2[name], st) if name in pass2 else st
+
+    fits = {name: {"n": int(st["n"])} for name, st in pass1.items() if name not in solved}
+    for name, (beta, XtX_inv, _) in solved.items():
+        st = pass2[name]
+        vcov_hc3 = XtX_inv @ st["meat"] @ XtX_inv
+        fits[name] = {
+            "n": int(pass1[name]["n"]),
+            "r2": 1 - st["ssr"] / st["sst"] if st["sst"] > 0 else np.nan,
+            "beta": beta,
+            "se_hc3": np.sqrt(np.diag(vcov_hc3)),
+        }
+    return fits
+
+
+def _surface_params(beta: np.ndarray) -> np.ndarray:
+    # beta includes intercept at [0]; b1=anx_z, b2=avoid_z, b3=anx2, b4=anx_x_avoid, b5=avoid2
+    b1, b2, b3, b4, b5 = beta[1:6]
+    return np.array([b1 + b2, b3 + b4 + b5, b1 - b2, b3 - b4 + b5])
+
+
 def _design(df: pd.DataFrame, cols):
     X = df[cols].astype(float).to_numpy()
     return X
 
 
+def _r2(y, yhat):
+    ssr = np.sum((y - yhat) ** 2)
+    sst = np.sum((y - np.mean(y)) ** 2)
+    return 1 - ssr / sst if sst > 0 else np.nan
+
+
+def _response_surface_frame(df_b: pd.DataFrame) -> pd.DataFrame:
+    # anx_z + avoid_z + anx^2 + anx:avoid + avoid^2 (+ covars, already complete in df_b)
+    df_m = df_b.dropna(subset=["anx_z", "avoid_z"]).copy()
+    df_m["anx2"] = df_m["anx_z"] ** 2
+    df_m["avoid2"] = df_m["avoid_z"] ** 2
+    df_m["anx_x_avoid"] = df_m["anx_z"] * df_m["avoid_z"]
+    return df_m
+
+
+def _baseline_chunks(path: str, outcome: str, covars: list[str], usecols=None):
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=STREAM_CHUNK_ROWS):
+        yield chunk.dropna(subset=[outcome] + covars).copy()
+
+
+def _fit_streamed(path: str, outcome: str, covars: list[str], secondary_outcomes: list[str]) -> dict:
+    predictors = SURFACE_TERMS + covars
+    usecols = list(dict.fromkeys([outcome, "anx_z", "avoid_z"] + covars + secondary_outcomes))
+
+    def chunks():
+        for df_b in _baseline_chunks(path, outcome, covars, usecols):
+            df_m = _response_surface_frame(df_b)
+            block = {
+                "baseline": (_design(df_b, covars), df_b[outcome].astype(float).to_numpy()),
+                "full": (_design(df_m, predictors), df_m[outcome].astype(float).to_numpy()),
+            }
+            for sec in secondary_outcomes:
+                df_s = df_m.dropna(subset=[sec])
+                block[sec] = (_design(df_s, predictors), df_s[sec].astype(float).to_numpy())
+            yield block
+
+    return _ols_fit_streamed(chunks)
+
+
+def _write_predictions_streamed(path: str, out_csv: str, outcome: str, covars: list[str], fits: dict):
+    predictors = SURFACE_TERMS + covars
+    beta_b = fits["baseline"]["beta"]
+    beta_m = fits["full"]["beta"]
+    first = True
+    for df_b in _baseline_chunks(path, outcome, covars):
+        df_b["pci3_pred_baseline"] = beta_b[0] + _design(df_b, covars) @ beta_b[1:]
+        df_b["PUA_residual"] = df_b[outcome].astype(float) - df_b["pci3_pred_baseline"]
+        df_m = _response_surface_frame(df_b)
+        df_m["pci3_pred_full"] = beta_m[0] + _design(df_m, predictors) @ beta_m[1:]
+        df_m.to_csv(out_csv, mode="w" if first else "a", header=first, index=False)
+        first = False
+
+
 def main():
     ensure_dirs()
     in_csv = os.path.join(OUT_DIR, "prepared_pua_dataset.csv")
-    df = pd.read_csv(in_csv)
+    pred_csv = os.path.join(OUT_DIR, "modeling_dataset_with_predictions.csv")
+    columns = pd.read_csv(in_csv, nrows=0).columns
 
     # core covariates (use what's available)
     covars = ["cci_z", "opsev_z", "onco_z"]
-    if "age_z" in df.columns:
+    if "age_z" in columns:
         covars.append("age_z")
-    if "sex_bin" in df.columns:
+    if "sex_bin" in columns:
         covars.append("sex_bin")
 
     # baseline model: PCI³ ~ objective burden (+ optional demographics)
+    # full model: attachment response surface + covars
+    # secondary outcomes: same response-surface specification per PCI³ component
     outcome = "periop_intensity_index_z"
-    needed = [outcome] + covars
-    df_b = df.dropna(subset=needed).copy()
-    Xb = _design(df_b, covars)
-    yb = df_b[outcome].astype(float).to_numpy()
-
-    beta_b, se_b, yhat_b, resid_b = _ols_fit(Xb, yb)
-    df_b["pci3_pred_baseline"] = yhat_b
-    df_b["PUA_residual"] = resid_b
-
-    # attachment response surface model
-    # anx_z + avoid_z + anx^2 + anx:avoid + avoid^2 + covars
-    df_m = df_b.dropna(subset=["anx_z", "avoid_z"]).copy()
-    df_m["anx2"] = df_m["anx_z"] ** 2
-    df_m["avoid2"] = df_m["avoid_z"] ** 2
-    df_m["anx_x_avoid"] = df_m["anx_z"] * df_m["avoid_z"]
-
-    predictors = ["anx_z", "avoid_z", "anx2", "anx_x_avoid", "avoid2"] + covars
-    Xm = _design(df_m, predictors)
-    ym = df_m[outcome].astype(float).to_numpy()
-
-    beta_m, se_m, yhat_m, resid_m = _ols_fit(Xm, ym)
-    df_m["pci3_pred_full"] = yhat_m
-
-    # surface parameters (using coefficients without intercept)
-    # beta vector includes intercept at [0]
-    # mapping:
-    # b1=anx_z, b2=avoid_z, b3=anx2, b4=anx_x_avoid, b5=avoid2
-    b1, b2, b3, b4, b5 = beta_m[1:6]
-    a1 = b1 + b2
-    a2 = b3 + b4 + b5
-    a3 = b1 - b2
-    a4 = b3 - b4 + b5
+    predictors = SURFACE_TERMS + covars
+    secondary_outcomes = [c for c in SECONDARY_OUTCOMES if c in columns]
+
+    fit_mode = "streamed" if os.path.getsize(in_csv) >= STREAM_MIN_BYTES else "in_memory"
+    if fit_mode == "streamed":
+        # registry-scale extracts: bounded memory, no case bootstrap
+        fits = _fit_streamed(in_csv, outcome, covars, secondary_outcomes)
+        _write_predictions_streamed(in_csv, pred_csv, outcome, covars, fits)
+        boot_streams = []
+    else:
+        df = read_frame(in_csv)
+        df_b = df.dropna(subset=[outcome] + covars).copy()
+        yb = df_b[outcome].astype(float).to_numpy()
+        beta_b, se_b, yhat_b, resid_b = _ols_fit(_design(df_b, covars), yb)
+        df_b["pci3_pred_baseline"] = yhat_b
+        df_b["PUA_residual"] = resid_b
+
+        df_m = _response_surface_frame(df_b)
+        Xm = _design(df_m, predictors)
+        ym = df_m[outcome].astype(float).to_numpy()
+        beta_m, se_m, yhat_m, resid_m = _ols_fit(Xm, ym)
+        df_m["pci3_pred_full"] = yhat_m
+
+        fits = {
+            "baseline": {"n": int(df_b.shape[0]), "r2": _r2(yb, yhat_b), "beta": beta_b, "se_hc3": se_b},
+            "full": {"n": int(df_m.shape[0]), "r2": _r2(ym, yhat_m), "beta": beta_m, "se_hc3": se_m},
+        }
+        for sec in secondary_outcomes:
+            df_s = df_m.dropna(subset=[sec])
+            if df_s.shape[0] <= len(predictors) + 1:
+                fits[sec] = {"n": int(df_s.shape[0])}
+                continue
+            ys = df_s[sec].astype(float).to_numpy()
+            beta_s, se_s, yhat_s, _ = _ols_fit(_design(df_s, predictors), ys)
+            fits[sec] = {"n": int(df_s.shape[0]), "r2": _r2(ys, yhat_s), "beta": beta_s, "se_hc3": se_s}
+
+        # Save modeling dataset with predictions/residuals
+        df_m.to_csv(pred_csv, index=False)
+
+        # optional nonparametric case bootstrap of a1–a4 (percentile 95% CI)
+        boot_streams = []
+        if N_BOOT > 0:
+            Xm_ = np.column_stack([np.ones(Xm.shape[0]), Xm])
+
+            def _boot_surface(rng, n_reps):
+                idx = rng.integers(0, Xm_.shape[0], size=(n_reps, Xm_.shape[0]))
+                return np.array([_surface_params(np.linalg.lstsq(Xm_[i], ym[i], rcond=None)[0]) for i in idx])
+
+            boot_surface, boot_streams = run_replicates("bootstrap", N_BOOT, _boot_surface, workers=N_WORKERS)
+            surf_lo, surf_hi = np.percentile(boot_surface, [2.5, 97.5], axis=0)
+
+    # secondary outcomes too sparse to fit (n <= k) are reported, not fatal
+    skipped_secondary = [sec for sec in secondary_outcomes if "beta" not in fits[sec]]
+    secondary_outcomes = [sec for sec in secondary_outcomes if sec not in skipped_secondary]
+
+    # surface parameters (linear combinations of the first-/second-order terms)
+    a1, a2, a3, a4 = _surface_params(fits["full"]["beta"])
 
     # Model fit summaries
-    def r2(y, yhat):
-        ssr = np.sum((y - yhat) ** 2)
-        sst = np.sum((y - np.mean(y)) ** 2)
-        return 1 - ssr / sst if sst > 0 else np.nan
-
-    r2_baseline = r2(yb, yhat_b)
-    r2_full = r2(ym, yhat_m)
+    r2_baseline = fits["baseline"]["r2"]
+    r2_full = fits["full"]["r2"]
     delta_r2 = r2_full - r2_baseline
 
     out = {
         "timestamp": now_iso(),
         "seed": SEED,
-        "n_baseline": int(df_b.shape[0]),
-        "n_full": int(df_m.shape[0]),
+        "fit_mode": fit_mode,
+        "n_baseline": fits["baseline"]["n"],
+        "n_full": fits["full"]["n"],
         "covariates_used": covars,
         "baseline": {
             "predictors": covars,
             "r2": float(r2_baseline),
-            "beta": beta_b.tolist(),
-            "se_hc3": se_b.tolist(),
+            "beta": fits["baseline"]["beta"].tolist(),
+            "se_hc3": fits["baseline"]["se_hc3"].tolist(),
         },
         "full_response_surface": {
             "predictors": predictors,
             "r2": float(r2_full),
             "delta_r2_vs_baseline": float(delta_r2),
-            "beta": beta_m.tolist(),
-            "se_hc3": se_m.tolist(),
+            "beta": fits["full"]["beta"].tolist(),
+            "se_hc3": fits["full"]["se_hc3"].tolist(),
             "surface_params": {"a1": float(a1), "a2": float(a2), "a3": float(a3), "a4": float(a4)},
+            "surface_params_boot_ci95": {
+                name: [float(lo), float(hi)] for name, lo, hi in zip(["a1", "a2", "a3", "a4"], surf_lo, surf_hi)
+            } if boot_streams else None,
+            "n_boot": N_BOOT if boot_streams else 0,
+        },
+        "secondary_outcomes": {
+            sec: {
+                "predictors": predictors,
+                "n": fits[sec]["n"],
+                "r2": float(fits[sec]["r2"]),
+                "beta": fits[sec]["beta"].tolist(),
+                "se_hc3": fits[sec]["se_hc3"].tolist(),
+            }
+            for sec in secondary_outcomes
+        },
+        "secondary_outcomes_skipped": {
+            sec: {"n": fits[sec]["n"], "reason": f"n <= k ({len(predictors) + 1} incl. intercept)"}
+            for sec in skipped_secondary
+        },
+        "rng": {
+            "bit_generator": "PCG64",
+            "block_size": RNG_BLOCK_SIZE,
+            "streams": {"bootstrap": boot_streams},
         },
     }
 
     write_json(os.path.join(OUT_DIR, "model_results.json"), out)
 
-    # Save modeling dataset with predictions/residuals
-    df_m.to_csv(os.path.join(OUT_DIR, "modeling_dataset_with_predictions.csv"), index=False)
-
     # Compact tables (CSV)
     # Table 2: main model coefficients (unstandardized B on z-scaled outcome)
     rows = []
     names = ["Intercept"] + predictors
-    for name, b, se in zip(names, beta_m, se_m):
+    for name, b, se in zip(names, fits["full"]["beta"], fits["full"]["se_hc3"]):
         rows.append({"term": name, "B": b, "SE_HC3": se})
     pd.DataFrame(rows).to_csv(os.path.join(OUT_DIR, "tables", "table2_main_model_coeffs.csv"), index=False)
 
+    # Table 4: secondary outcome coefficients (long format; one block per outcome)
+    rows = []
+    for sec in secondary_outcomes:
+        for name, b, se in zip(names, fits[sec]["beta"], fits[sec]["se_hc3"]):
+            rows.append({"outcome": sec, "term": name, "B": b, "SE_HC3": se})
+    pd.DataFrame(rows, columns=["outcome", "term", "B", "SE_HC3"]).to_csv(
+        os.path.join(OUT_DIR, "tables", "table4_secondary_models_coeffs.csv"), index=False
+    )
+
     pd.DataFrame(
         [
             {"param": "a1 (slope congruence)", "value": a1},
@@ -1,22 +1,77 @@
 import os
+import math
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from utils import OUT_DIR, ensure_dirs
+from utils import OUT_DIR, ensure_dirs, read_frame
 
 
-def savefig(path):
-    plt.tight_layout()
-    plt.savefig(path, dpi=300, bbox_inches="tight", facecolor="white")
-    plt.close()
+# watch.py sets PREVIEW: low-dpi, fast-compressed renders without layout passes, written
+# to figures_preview/ so the manuscript figures in figures/ are never overwritten.
+PREVIEW = False
+FIG_DPI = 300
+PREVIEW_DPI = 72
+# zlib level 1: PNG encoding was ~1/4 of preview time at the default level
+PREVIEW_PNG = {"compress_level": 1}
+
+SURFACE_TERMS = ("Intercept", "anx_z", "avoid_z", "anx2", "anx_x_avoid", "avoid2")
+
+OUTCOME_LABELS = {
+    "utilization_shortterm_z": "Utilization intensity (z)",
+    "pharmaburden_z": "Pharmacotherapy burden (z)",
+    "pain_burden_z": "Pain-related burden (z)",
+    "sedation_risk_z": "Sedation risk (z)",
+}
+
+# Quadrant centres in (anx_z, avoid_z) space, labelled by attachment prototype
+QUADRANTS = {
+    "secure": (-1.25, -1.25),
+    "anxious": (1.25, -1.25),
+    "avoidant": (-1.25, 1.25),
+    "fearful": (1.25, 1.25),
+}
+
+
+def _surface_grid_design(grid, terms, covar_values: dict) -> np.ndarray:
+    """
+    Design matrix for every cell of the anx_z × avoid_z grid (row-major, avoid_z along rows).
+    Columns follow `terms`; covariates are held at `covar_values` (0 if unavailable).
+    """
+    anx, avoid = np.meshgrid(grid, grid)
+    anx = anx.ravel()
+    avoid = avoid.ravel()
+    surface = {
+        "Intercept": np.ones_like(anx),
+        "anx_z": anx,
+        "avoid_z": avoid,
+        "anx2": anx ** 2,
+        "anx_x_avoid": anx * avoid,
+        "avoid2": avoid ** 2,
+    }
+    X = np.empty((anx.size, len(terms)))
+    for j, t in enumerate(terms):
+        X[:, j] = surface[t] if t in surface else covar_values.get(t, 0.0)
+    return X
+
+
+def savefig(path, fig=None):
+    fig = fig or plt.gcf()
+    if PREVIEW:
+        fig.savefig(path, dpi=PREVIEW_DPI, facecolor="white", pil_kwargs=PREVIEW_PNG)
+    else:
+        if fig.get_layout_engine() is None:
+            fig.tight_layout()
+        fig.savefig(path, dpi=FIG_DPI, bbox_inches="tight", facecolor="white")
+    plt.close(fig)
 
 
 def main():
     ensure_dirs()
-    df = pd.read_csv(os.path.join(OUT_DIR, "modeling_dataset_with_predictions.csv"))
+    df = read_frame(os.path.join(OUT_DIR, "modeling_dataset_with_predictions.csv"))
 
-    fig_dir = os.path.join(OUT_DIR, "figures")
+    fig_dir = os.path.join(OUT_DIR, "figures_preview" if PREVIEW else "figures")
+    os.makedirs(fig_dir, exist_ok=True)
 
     # Figure 2: response-surface heatmap (predicted PCI³)
     # Build grid over anx_z/avoid_z; hold covariates at median; use fitted betas from table2
@@ -84,6 +139,52 @@ def main():
     plt.title("Main model coefficients (HC3; 95% CI)")
     savefig(os.path.join(fig_dir, "figure4_forest_main_model.png"))
 
+    # Figure 5: small multiples of response surfaces per secondary outcome
+    # All surfaces come from one (grid × terms) @ (terms × outcomes) product on a shared grid.
+    sec_path = os.path.join(OUT_DIR, "tables", "table4_secondary_models_coeffs.csv")
+    sec = pd.read_csv(sec_path) if os.path.exists(sec_path) else pd.DataFrame()
+    if not sec.empty:
+        outcomes = list(dict.fromkeys(sec["outcome"]))
+        sec_terms = list(dict.fromkeys(sec["term"]))
+        B_sec = sec.pivot(index="term", columns="outcome", values="B").reindex(index=sec_terms, columns=outcomes)
+        B_sec = B_sec.fillna(0.0).to_numpy()
+
+        sec_medians = {c: float(df[c].median()) for c in sec_terms if c not in SURFACE_TERMS and c in df.columns}
+        X_grid = _surface_grid_design(grid, sec_terms, sec_medians)
+        surfaces = (X_grid @ B_sec).T.reshape(len(outcomes), grid.size, grid.size)
+        vmax = float(np.nanmax(np.abs(surfaces)))
+
+        ncols = min(2, len(outcomes))
+        nrows = math.ceil(len(outcomes) / ncols)
+        fig, axes = plt.subplots(
+            nrows, ncols, figsize=(5.0 * ncols + 1.5, 4.5 * nrows), sharex=True, sharey=True, squeeze=False,
+            layout=None if PREVIEW else "constrained",
+        )
+        for ax, outcome, surf in zip(axes.flat, outcomes, surfaces):
+            im = ax.imshow(
+                surf,
+                origin="lower",
+                extent=[grid.min(), grid.max(), grid.min(), grid.max()],
+                aspect="auto",
+                cmap="RdYlBu_r",
+                vmin=-vmax,
+                vmax=vmax,
+            )
+            ax.axhline(0, color="black", linewidth=0.6, alpha=0.6)
+            ax.axvline(0, color="black", linewidth=0.6, alpha=0.6)
+            for label, (qx, qy) in QUADRANTS.items():
+                ax.text(qx, qy, label, ha="center", va="center", fontsize=9, color="black", alpha=0.8)
+            ax.set_title(OUTCOME_LABELS.get(outcome, outcome))
+        for ax in axes.flat[len(outcomes):]:
+            ax.set_visible(False)
+        for ax in axes[-1, :]:
+            ax.set_xlabel("Attachment anxiety (anx_z)")
+        for ax in axes[:, 0]:
+            ax.set_ylabel("Attachment avoidance (avoid_z)")
+        fig.colorbar(im, ax=axes.ravel().tolist(), label="Predicted outcome (z; shared scale)")
+        fig.suptitle("Response surfaces by secondary outcome\n(covariates held at median)")
+        savefig(os.path.join(fig_dir, "figure5_outcome_surfaces_small_multiples.png"), fig)
+
     print("✓ Figures written to:", fig_dir)
 
 
@@ -2,7 +2,7 @@ import os
 import pandas as pd
 import json
 
-from utils import OUT_DIR, ensure_dirs, write_md, now_iso
+from utils import OUT_DIR, ensure_dirs, read_frame, write_md, now_iso
 
 
 def _p_from_t_approx(t: float) -> float:
@@ -44,7 +44,7 @@ def _write_tex(path: str, text: str):
 def main():
     ensure_dirs()
 
-    df = pd.read_csv(os.path.join(OUT_DIR, "prepared_pua_dataset.csv"))
+    df = read_frame(os.path.join(OUT_DIR, "prepared_pua_dataset.csv"))
     # model_results.json is a nested dict; use plain json loader (pandas may error on nested dicts)
     with open(os.path.join(OUT_DIR, "model_results.json"), "r", encoding="utf-8") as f:
         model_res = json.load(f)
@@ -253,6 +253,7 @@ def main():
 - **Figure 2. Response surface heatmap.** Predicted PCI³ over standardized anxiety × avoidance (covariates at median).
 - **Figure 3. Perioperative Utilization Amplification (PUA).** Residual PCI³ after baseline objective burden model plotted against attachment insecurity.
 - **Figure 4. Coefficient forest plot.** Main model coefficients with 95% CI (HC3).
+- **Figure 5. Outcome panel.** Small multiples of predicted response surfaces for each secondary outcome over standardized anxiety × avoidance (shared colour scale; covariates at median; quadrants labelled secure/anxious/avoidant/fearful).
 """,
     )
 
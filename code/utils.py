@@ -1,5 +1,6 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import numpy as np
@@ -10,6 +11,18 @@ ROOT = "/home/jbs123/Dokumente/intake"
 BASE_DIR = os.path.join(ROOT, "04_exotic_manis")
 OUT_DIR = os.path.join(BASE_DIR, "outputs_pua")
 
+# Reproducible RNG streams.
+# Every resampling engine gets a fixed slot under the root SeedSequence, and every
+# block of RNG_BLOCK_SIZE replicates gets its own child stream under that slot.
+# Streams depend only on (SEED, engine, block), never on worker count or scheduling.
+SEED = 1337
+RNG_ENGINES = ("bootstrap", "permutation", "cv", "imputation")
+RNG_BLOCK_SIZE = 100
+
+# In-process cache for read_frame(); None disables it (one-shot script runs).
+# Long-running drivers (watch.py) set it to {} to keep loaded data warm.
+FRAME_CACHE = None
+
 
 def ensure_dirs():
     os.makedirs(OUT_DIR, exist_ok=True)
@@ -17,22 +30,90 @@ def ensure_dirs():
     os.makedirs(os.path.join(OUT_DIR, "figures"), exist_ok=True)
 
 
-def zscore(series: pd.Series) -> pd.Series:
+def zscore(series: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
     s = series.astype(float)
     mu = s.mean(skipna=True)
     sd = s.std(skipna=True, ddof=0)
+    if isinstance(s, pd.DataFrame):
+        # column-wise; zero-variance columns map to 0 like the Series case
+        return (s - mu) / sd.replace(0, np.inf)
     if sd == 0 or np.isnan(sd):
         return (s - mu) * 0.0
     return (s - mu) / sd
 
 
-def log1p_safe(series: pd.Series) -> pd.Series:
+def log1p_safe(series: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
     s = series.astype(float).copy()
     # ensure non-negative for count-like data
     s[s < 0] = np.nan
     return np.log1p(s)
 
 
+def rng_spawn_key(engine: str, block: int | None = None) -> tuple[int, ...]:
+    """
+    Spawn key of an engine stream (or of one replicate block within it).
+    Identical to SeedSequence(SEED).spawn(...)[engine].spawn(...)[block].spawn_key.
+    """
+    if engine not in RNG_ENGINES:
+        raise ValueError(f"Unknown RNG engine '{engine}'; expected one of {RNG_ENGINES}")
+    key = (RNG_ENGINES.index(engine),)
+    return key if block is None else key + (int(block),)
+
+
+def rng_stream(engine: str, block: int | None = None, seed: int = SEED) -> np.random.Generator:
+    """Independent Generator for an engine (or one of its replicate blocks)."""
+    ss = np.random.SeedSequence(seed, spawn_key=rng_spawn_key(engine, block))
+    return np.random.default_rng(ss)
+
+
+def replicate_blocks(n_reps: int, block_size: int = RNG_BLOCK_SIZE) -> list[tuple[int, int, int]]:
+    """Split n_reps replicates into fixed (block, start, stop) ranges."""
+    return [(b, start, min(start + block_size, n_reps)) for b, start in enumerate(range(0, n_reps, block_size))]
+
+
+def run_replicates(engine: str, n_reps: int, fn, workers: int = 1, seed: int = SEED):
+    """
+    Run `fn(rng, n)` once per replicate block and stack the results in block order.
+
+    `fn` must return an array with one row per replicate. Each block draws from its
+    own stream, so the output is bit-identical for any `workers` value.
+    Returns (results, streams) where `streams` records each block's spawn key.
+    """
+    blocks = replicate_blocks(n_reps)
+
+    def _run(block):
+        b, start, stop = block
+        return np.asarray(fn(rng_stream(engine, b, seed), stop - start))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run, blocks))
+    else:
+        parts = [_run(block) for block in blocks]
+
+    streams = [
+        {"block": b, "replicates": [start, stop], "spawn_key": list(rng_spawn_key(engine, b))}
+        for b, start, stop in blocks
+    ]
+    return np.concatenate(parts, axis=0), streams
+
+
+def read_frame(path: str, reader=pd.read_csv, **kwargs) -> pd.DataFrame:
+    """
+    Read a table via `reader`, reusing the cached frame while the file is unchanged
+    (same mtime and size). Callers always get their own copy.
+    """
+    if FRAME_CACHE is None:
+        return reader(path, **kwargs)
+    st = os.stat(path)
+    sig = (st.st_mtime_ns, st.st_size)
+    key = (os.path.abspath(path), reader.__name__, tuple(sorted(kwargs.items())))
+    hit = FRAME_CACHE.get(key)
+    if hit is None or hit[0] != sig:
+        hit = FRAME_CACHE[key] = (sig, reader(path, **kwargs))
+    return hit[1].copy()
+
+
 def write_json(path: str, obj):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,255 @@
+import os
+import time
+import queue
+import shutil
+import argparse
+import importlib
+import traceback
+import subprocess
+
+import utils
+from utils import BASE_DIR
+
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.join(BASE_DIR, "docs")
+TEX_FILE = os.path.join(DOCS_DIR, "manuskript_04_pua_highimpact_apa7.tex")
+BIB_FILE = os.path.join(DOCS_DIR, "manuskript_04_refs_selected45_2020plus.bib")
+
+PY_STAGES = ["01_prep", "02_models", "03_figures", "04_tables_and_snippets"]
+STAGES = PY_STAGES + ["tex"]
+
+# stage -> stages that read its outputs
+DOWNSTREAM = {
+    "01_prep": ["02_models", "04_tables_and_snippets"],
+    "02_models": ["03_figures", "04_tables_and_snippets"],
+    "03_figures": ["tex"],
+    "04_tables_and_snippets": ["tex"],
+    "tex": [],
+}
+
+# editors often save in several writes; coalesce events within this window
+DEBOUNCE_S = 0.15
+
+
+def _graph(final: bool) -> dict:
+    """Stage graph for this mode.
+
+    Previews go to figures_preview/, which the manuscript does not include, so
+    03_figures -> tex only exists when rendering final figures.
+    """
+    downstream = {s: list(downs) for s, downs in DOWNSTREAM.items()}
+    if not final:
+        downstream["03_figures"].remove("tex")
+    return downstream
+
+
+def _affected(roots, downstream: dict) -> list[str]:
+    """Roots plus everything downstream of them, in pipeline order."""
+    seen = set()
+    todo = list(roots)
+    while todo:
+        s = todo.pop()
+        if s not in seen:
+            seen.add(s)
+            todo.extend(downstream[s])
+    return [s for s in STAGES if s in seen]
+
+
+def _triggers(modules: dict) -> dict:
+    """Watched path -> stage it invalidates."""
+    trig = {}
+    if modules.get("01_prep") is not None:
+        trig[os.path.abspath(modules["01_prep"].DATA_XLSX)] = "01_prep"
+    for name in PY_STAGES:
+        trig[os.path.join(CODE_DIR, f"{name}.py")] = name
+    trig[os.path.join(CODE_DIR, "utils.py")] = "01_prep"
+    trig[TEX_FILE] = "tex"
+    trig[BIB_FILE] = "tex"
+    return trig
+
+
+def _sig(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _poll_changes(paths, interval: float):
+    prev = {p: _sig(p) for p in paths}
+    while True:
+        time.sleep(interval)
+        cur = {p: _sig(p) for p in paths}
+        changed = {p for p in paths if cur[p] != prev[p]}
+        prev = cur
+        if changed:
+            yield changed
+
+
+def _watchdog_changes(paths):
+    # inotify (Linux) / FSEvents (macOS) via the optional `watchdog` package
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+
+    watched = set(paths)
+    events = queue.Queue()
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # ignore opened/read events (reloading a module opens its source)
+            if event.is_directory or event.event_type not in ("modified", "created", "moved", "deleted", "closed"):
+                return
+            for p in (event.src_path, getattr(event, "dest_path", "")):
+                p = os.path.abspath(os.fsdecode(p)) if p else ""
+                if p in watched:
+                    events.put(p)
+
+    observer = Observer()
+    for d in sorted({os.path.dirname(p) for p in paths if os.path.isdir(os.path.dirname(p))}):
+        observer.schedule(_Handler(), d, recursive=False)
+    observer.start()
+    try:
+        while True:
+            changed = {events.get()}
+            time.sleep(DEBOUNCE_S)
+            while not events.empty():
+                changed.add(events.get_nowait())
+            yield changed
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def _changes(paths, poll: bool, interval: float):
+    if not poll:
+        try:
+            import watchdog  # noqa: F401
+        except ImportError:
+            print("· watchdog not installed; falling back to polling every", interval, "s")
+        else:
+            return _watchdog_changes(paths)
+    return _poll_changes(paths, interval)
+
+
+def _build_tex():
+    if shutil.which("latexmk") is None:
+        print("· tex: latexmk not found; skipping PDF build")
+        return
+    subprocess.run(
+        ["latexmk", "-pdf", "-interaction=nonstopmode", "-quiet", os.path.basename(TEX_FILE)],
+        cwd=DOCS_DIR,
+        check=True,
+    )
+
+
+def _load(name: str, modules: dict) -> bool:
+    """(Re)import a stage module into `modules`; a broken stage is kept as None."""
+    try:
+        mod = modules.get(name)
+        modules[name] = importlib.reload(mod) if mod is not None else importlib.import_module(name)
+    except Exception:
+        traceback.print_exc()
+        print(f"✗ import failed: {name}")
+        modules[name] = None
+        return False
+    return True
+
+
+def _reload(changed, modules: dict) -> bool:
+    """Reload edited modules in place; returns False if utils failed to reload."""
+    if os.path.join(CODE_DIR, "utils.py") in changed:
+        try:
+            importlib.reload(utils).FRAME_CACHE = {}
+        except Exception:
+            traceback.print_exc()
+            print("✗ import failed: utils")
+            return False
+        names = PY_STAGES
+    else:
+        names = [n for n in PY_STAGES if os.path.join(CODE_DIR, f"{n}.py") in changed]
+    for name in names:
+        _load(name, modules)
+    return True
+
+
+def _run_stages(stages, modules: dict, downstream: dict, preview: bool):
+    failed = set()
+    for name in stages:
+        blocked = [u for u in STAGES if name in downstream[u] and u in failed]
+        if blocked:
+            print(f"· {name}: skipped (upstream failed: {', '.join(blocked)})")
+            failed.add(name)
+            continue
+        if name != "tex" and modules[name] is None:
+            print(f"· {name}: skipped (module failed to import)")
+            failed.add(name)
+            continue
+        t0 = time.perf_counter()
+        try:
+            if name == "tex":
+                _build_tex()
+            else:
+                if hasattr(modules[name], "PREVIEW"):
+                    modules[name].PREVIEW = preview
+                modules[name].main()
+        except Exception:
+            traceback.print_exc()
+            print(f"✗ {name} failed")
+            failed.add(name)
+            continue
+        print(f"· {name}: {time.perf_counter() - t0:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run affected pipeline stages on file changes.")
+    parser.add_argument("--poll", action="store_true", help="use stat polling even if watchdog is installed")
+    parser.add_argument("--interval", type=float, default=0.3, help="polling interval in seconds")
+    parser.add_argument(
+        "--final",
+        action="store_true",
+        help="render manuscript figures (300 dpi, figures/) instead of previews (figures_preview/)",
+    )
+    parser.add_argument("--skip-initial", action="store_true", help="do not run the full pipeline at startup")
+    args = parser.parse_args()
+
+    # keep parsed inputs warm across runs (see utils.read_frame)
+    utils.FRAME_CACHE = {}
+    downstream = _graph(args.final)
+    modules = {}
+    for name in PY_STAGES:
+        _load(name, modules)
+    triggers = _triggers(modules)
+
+    if not args.skip_initial:
+        _run_stages(_affected(["01_prep"], downstream), modules, downstream, not args.final)
+
+    try:
+        while True:
+            watched = sorted(triggers)
+            print("✓ Watching", len(watched), "files (Ctrl+C to stop)")
+            changes = _changes(watched, args.poll, args.interval)
+            try:
+                for changed in changes:
+                    t0 = time.perf_counter()
+                    rel = sorted(os.path.relpath(p, BASE_DIR) if p.startswith(BASE_DIR) else p for p in changed)
+                    print("\n→ changed:", ", ".join(rel))
+                    if not _reload(changed, modules):
+                        continue
+                    roots = {triggers[p] for p in changed}
+                    _run_stages(_affected(roots, downstream), modules, downstream, not args.final)
+                    print(f"✓ done in {time.perf_counter() - t0:.2f}s")
+                    # the workbook path comes from 01_prep; re-arm if a reload changed it
+                    # (e.g. 01_prep failed to import at startup and has now been fixed)
+                    triggers = _triggers(modules)
+                    if sorted(triggers) != watched:
+                        break
+            finally:
+                changes.close()
+    except KeyboardInterrupt:
+        print("\n✓ Watch stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,44 @@ set -euo pipefail
 # Local timeline autosave for reproducibility / archiving.
 # Creates timestamped snapshots under: 04_exotic_manis/audit/timeline/
 #
-# Contents per snapshot:
+# Contents per snapshot (full mode, default):
 # - git bundle (full repo history)
 # - git metadata (status, log, config, remotes)
 # - working tree diff (if any)
 # - optional: compiled PDF (if present and --include-pdf)
 #
+# Incremental mode (--incremental) keeps each snapshot proportional to what changed:
+# - git bundle only of commits not reachable from any ref tip recorded in the
+#   previous snapshot (refs.txt); skipped when no ref moved (restore by fetching
+#   the bundles in index order; falls back to a full bundle if there is no
+#   usable previous snapshot)
+# - git log since the previous HEAD instead of the last 200 commits
+# - config/remotes/diffs and all files under outputs_pua/ stored once in a
+#   content-addressed store (audit/timeline/objects/<sha256>); the snapshot keeps
+#   only a sha256 listing (objects.tsv, artifacts.tsv). Unchanged artifacts
+#   (same size + nanosecond mtime as in the previous snapshot) are not re-hashed.
+#
+# Every snapshot appends one line to audit/timeline/index.tsv.
+#
+# Requires bash >= 3.2 (macOS /bin/bash works), git, and sha256sum or shasum.
+#
 # Usage:
 #   ./tools/timeline_autosave.sh
 #   ./tools/timeline_autosave.sh --include-pdf
+#   ./tools/timeline_autosave.sh --incremental [--include-pdf]
 
 INCLUDE_PDF=0
-if [[ "${1:-}" == "--include-pdf" ]]; then
-  INCLUDE_PDF=1
-fi
+INCREMENTAL=0
+for arg in "$@"; do
+  case "$arg" in
+    --include-pdf) INCLUDE_PDF=1 ;;
+    --incremental) INCREMENTAL=1 ;;
+    *)
+      echo "ERROR: Unknown option: $arg" >&2
+      exit 2
+      ;;
+  esac
+done
 
 REPO_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 cd "$REPO_ROOT"
@@ -27,42 +51,180 @@ if ! git rev-parse --is-inside-work-tree >/dev/null 2>&1; then
   exit 1
 fi
 
+TIMELINE_DIR="$REPO_ROOT/audit/timeline"
+INDEX="$TIMELINE_DIR/index.tsv"
+OBJ_DIR="$TIMELINE_DIR/objects"
+ARTIFACT_DIR="$REPO_ROOT/outputs_pua"
+
 TS="$(date -u +"%Y%m%dT%H%M%SZ")"
-OUT_DIR="$REPO_ROOT/audit/timeline/$TS"
+OUT_DIR="$TIMELINE_DIR/$TS"
 mkdir -p "$OUT_DIR"
 
 echo "Writing snapshot: $OUT_DIR"
 
+if [[ ! -f "$INDEX" ]]; then
+  printf '# timestamp_utc\thead\tmode\tbase_snapshot\tnew_objects\tnew_bytes\n' > "$INDEX"
+fi
+
+hash_file() {
+  if command -v sha256sum >/dev/null 2>&1; then
+    sha256sum "$1" | cut -d' ' -f1
+  else
+    shasum -a 256 "$1" | cut -d' ' -f1
+  fi
+}
+
+file_sig() {
+  # "<size>\t<mtime with ns>" (GNU stat, BSD stat fallback); whole seconds would
+  # miss same-size rewrites within one second of the previous snapshot
+  stat -c '%s	%.9Y' "$1" 2>/dev/null || stat -f '%z	%Fm' "$1"
+}
+
+# Content-addressed store: sets STORED_SHA; copies the file only if the object is new.
+NEW_OBJECTS=0
+NEW_BYTES=0
+store_object() {
+  local src="$1" sha="${2:-}"
+  [[ -n "$sha" ]] || sha="$(hash_file "$src")"
+  if [[ ! -f "$OBJ_DIR/$sha" ]]; then
+    cp "$src" "$OBJ_DIR/$sha.tmp.$$"
+    mv "$OBJ_DIR/$sha.tmp.$$" "$OBJ_DIR/$sha"
+    NEW_OBJECTS=$((NEW_OBJECTS + 1))
+    NEW_BYTES=$((NEW_BYTES + $(wc -c < "$src")))
+  fi
+  STORED_SHA="$sha"
+}
+
 # Core git metadata
 git rev-parse HEAD > "$OUT_DIR/HEAD.txt"
 git branch --show-current > "$OUT_DIR/branch.txt" || true
 git status --porcelain=v1 -b > "$OUT_DIR/status.txt"
-git remote -v > "$OUT_DIR/remotes.txt" || true
-git log --decorate --oneline -n 200 > "$OUT_DIR/log_last200_oneline.txt"
-git log --decorate -n 50 > "$OUT_DIR/log_last50_full.txt"
 git show -s --format=fuller HEAD > "$OUT_DIR/HEAD_fuller.txt"
-git config --list --show-origin > "$OUT_DIR/git_config_show_origin.txt" || true
+git for-each-ref --format='%(objectname) %(refname)' > "$OUT_DIR/refs.txt"
+
+if [[ "$INCREMENTAL" -eq 0 ]]; then
+  git remote -v > "$OUT_DIR/remotes.txt" || true
+  git log --decorate --oneline -n 200 > "$OUT_DIR/log_last200_oneline.txt"
+  git log --decorate -n 50 > "$OUT_DIR/log_last50_full.txt"
+  git config --list --show-origin > "$OUT_DIR/git_config_show_origin.txt" || true
+
+  # Working tree patch (if any)
+  git diff > "$OUT_DIR/working_tree.diff" || true
+  git diff --cached > "$OUT_DIR/index.diff" || true
+
+  # Full history bundle (restorable without network)
+  git bundle create "$OUT_DIR/repo.bundle" --all
+  BASE_SNAPSHOT="-"
+  MODE="full"
+else
+  MODE="incremental"
+  mkdir -p "$OBJ_DIR"
+
+  PREV_TS=""
+  PREV_HEAD=""
+  if grep -qv '^#' "$INDEX"; then
+    IFS=$'\t' read -r PREV_TS PREV_HEAD _ < <(grep -v '^#' "$INDEX" | tail -n 1)
+  fi
+
+  # Exclude every ref tip of the previous snapshot that still exists locally
+  BASE_SNAPSHOT="-"
+  PREV_REFS="$TIMELINE_DIR/$PREV_TS/refs.txt"
+  EXCLUDE=()
+  if [[ -n "$PREV_TS" && -f "$PREV_REFS" ]] && git cat-file -e "${PREV_HEAD}^{commit}" 2>/dev/null; then
+    BASE_SNAPSHOT="$PREV_TS"
+    while read -r tip _; do
+      if git cat-file -e "$tip" 2>/dev/null; then
+        EXCLUDE+=("^$tip")
+      fi
+    done < "$PREV_REFS"
+  fi
 
-# Working tree patch (if any)
-git diff > "$OUT_DIR/working_tree.diff" || true
-git diff --cached > "$OUT_DIR/index.diff" || true
+  if [[ "$BASE_SNAPSHOT" == "-" ]]; then
+    git log --decorate --oneline -n 200 > "$OUT_DIR/log_last200_oneline.txt"
+    git bundle create "$OUT_DIR/repo.bundle" --all
+  else
+    git log --decorate --oneline "$PREV_HEAD..HEAD" > "$OUT_DIR/log_since_prev_oneline.txt"
+    if cmp -s "$PREV_REFS" "$OUT_DIR/refs.txt"; then
+      echo "No ref moved since $BASE_SNAPSHOT; bundle skipped."
+    # ${EXCLUDE[@]+...}: an empty array is "unbound" under set -u before bash 4.4
+    elif [[ "$(git rev-list --count --all ${EXCLUDE[@]+"${EXCLUDE[@]}"})" -gt 0 ]]; then
+      git bundle create "$OUT_DIR/repo.bundle" --all ${EXCLUDE[@]+"${EXCLUDE[@]}"}
+    else
+      echo "Refs moved but no new commits since $BASE_SNAPSHOT; bundle skipped (see refs.txt)."
+    fi
+  fi
 
-# Full history bundle (restorable without network)
-git bundle create "$OUT_DIR/repo.bundle" --all
+  # Metadata blobs that rarely change: dedup via the object store
+  TMP_META="$(mktemp -d)"
+  trap 'rm -rf "$TMP_META"' EXIT
+  git remote -v > "$TMP_META/remotes.txt" || true
+  git config --list --show-origin > "$TMP_META/git_config_show_origin.txt" || true
+  git diff > "$TMP_META/working_tree.diff" || true
+  git diff --cached > "$TMP_META/index.diff" || true
+  : > "$OUT_DIR/objects.tsv"
+  for f in remotes.txt git_config_show_origin.txt working_tree.diff index.diff; do
+    store_object "$TMP_META/$f"
+    printf '%s\t%s\n' "$STORED_SHA" "$f" >> "$OUT_DIR/objects.tsv"
+  done
+
+  # Output artifacts: reuse the previous sha256 when size + mtime are unchanged
+  # (awk join on the previous artifacts.tsv; no associative arrays, so bash 3.2 works)
+  PREV_ARTIFACTS="$TIMELINE_DIR/$PREV_TS/artifacts.tsv"
+  if [[ -z "$PREV_TS" || ! -f "$PREV_ARTIFACTS" ]]; then
+    PREV_ARTIFACTS=/dev/null
+  fi
+
+  : > "$TMP_META/current.tsv"
+  if [[ -d "$ARTIFACT_DIR" ]]; then
+    while IFS= read -r -d '' f; do
+      printf '%s\t%s\n' "$(file_sig "$f")" "${f#"$REPO_ROOT"/}" >> "$TMP_META/current.tsv"
+    done < <(find "$ARTIFACT_DIR" -type f -print0 | sort -z)
+  fi
+
+  # current.tsv: size, mtime, path -> prefix the previous sha256 if the signature matches, else "-"
+  : > "$OUT_DIR/artifacts.tsv"
+  while IFS=$'\t' read -r sha size mtime rel; do
+    [[ "$sha" != "-" ]] || sha=""
+    store_object "$REPO_ROOT/$rel" "$sha"
+    printf '%s\t%s\t%s\t%s\n' "$STORED_SHA" "$size" "$mtime" "$rel" >> "$OUT_DIR/artifacts.tsv"
+  done < <(awk -F'\t' -v OFS='\t' -v prev="$PREV_ARTIFACTS" '
+    FILENAME == prev { sig[$4] = $2 OFS $3; sha[$4] = $1; next }
+    { print (($3 in sig) && sig[$3] == $1 OFS $2 ? sha[$3] : "-"), $0 }
+  ' "$PREV_ARTIFACTS" "$TMP_META/current.tsv")
+fi
+
+# Optional compiled PDF (kept local; ignored by .gitignore)
+PDF_PATH="$REPO_ROOT/docs/manuskript_04_pua_highimpact_apa7.pdf"
+INCLUDED_PDF=""
+if [[ "$INCLUDE_PDF" -eq 1 && -f "$PDF_PATH" ]]; then
+  if [[ "$MODE" == "incremental" ]]; then
+    store_object "$PDF_PATH"
+    printf '%s\t%s\n' "$STORED_SHA" "$(basename "$PDF_PATH")" >> "$OUT_DIR/objects.tsv"
+  else
+    cp -a "$PDF_PATH" "$OUT_DIR/"
+  fi
+  INCLUDED_PDF="$(basename "$PDF_PATH")"
+fi
 
 # Manifest
 {
   echo "timestamp_utc=$TS"
   echo "repo_root=$REPO_ROOT"
   echo "head=$(cat "$OUT_DIR/HEAD.txt")"
+  echo "mode=$MODE"
+  if [[ "$MODE" == "incremental" ]]; then
+    echo "base_snapshot=$BASE_SNAPSHOT"
+    echo "bundle=$([[ -f "$OUT_DIR/repo.bundle" ]] && echo repo.bundle || echo none)"
+    echo "object_store=$OBJ_DIR"
+    echo "new_objects=$NEW_OBJECTS"
+    echo "new_bytes=$NEW_BYTES"
+  fi
+  if [[ -n "$INCLUDED_PDF" ]]; then
+    echo "included_pdf=$INCLUDED_PDF"
+  fi
 } > "$OUT_DIR/manifest.txt"
 
-# Optional compiled PDF (kept local; ignored by .gitignore)
-PDF_PATH="$REPO_ROOT/docs/manuskript_04_pua_highimpact_apa7.pdf"
-if [[ "$INCLUDE_PDF" -eq 1 && -f "$PDF_PATH" ]]; then
-  cp -a "$PDF_PATH" "$OUT_DIR/"
-  echo "included_pdf=$(basename "$PDF_PATH")" >> "$OUT_DIR/manifest.txt"
-fi
+printf '%s\t%s\t%s\t%s\t%s\t%s\n' \
+  "$TS" "$(cat "$OUT_DIR/HEAD.txt")" "$MODE" "$BASE_SNAPSHOT" "$NEW_OBJECTS" "$NEW_BYTES" >> "$INDEX"
 
 echo "OK: snapshot complete."
-